@@ -77,18 +77,12 @@ def prompt_go_first() -> bool:
 
 
 def prompt_difficulty() -> tuple[float, float]:
+    from minimax_ai import DIFFICULTIES
+
     def str_to_difficulty(inp: str) -> tuple[float, float]:
         match inp:
-            case "1":
-                return 0.0, 0.0
-            case "2":
-                return 0.2, 0.2
-            case "3":
-                return 0.4, 0.3
-            case "4":
-                return 0.6, 0.5
-            case "5":
-                return 1.0, 1.0
+            case "1" | "2" | "3" | "4" | "5":
+                return DIFFICULTIES[int(inp)]
 
         raise ValueError("Invalid difficulty")
 
@@ -1,5 +1,10 @@
 import dataclasses
+import functools
+import itertools
 import random
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Iterable
 
 from game import Player, Side, BoardView, has_won
 
@@ -19,47 +24,143 @@ class MinimaxAi(Player):
     The second number is the chance the AI will "think" about the obvious move, if they don't wanna think deeply
     """
 
-    def decide_move(self, board_view: BoardView, current_side: Side) -> int:
+    def decide_move(self, board_view: BoardView, current_side: Side, rng: random.Random | None = None) -> int:
+        """
+        Decide the next move. See `Player.decide_move`
+        :param board_view: the immutable view of the board
+        :param current_side: the current side taking turn
+        :param rng: the random generator to draw from. `None` to use the one of the calling thread,
+                    which can be seeded with `seed_thread_rng`
+        :return: the position (0-8) of the next move
+        """
+
+        # The instance is immutable and never touches the global `random` state, so one instance can be shared
+        # by many threads. Unless told otherwise, each thread draws from its own generator
+        if rng is None:
+            rng = _thread_rng()
+
+        position = _encode_board(board_view)
+
         # it saves a lot of runtime cost
         # it is guaranteed that all the tiles in the empty board have equal chances of winning
-        if all(tile is None for tile in board_view):
-            return random.randrange(0, 9)
+        if position == 0:
+            return rng.randrange(0, 9)
 
         # the AI don't wanna "think" deeply
-        if random.random() >= self.think_chance[0]:
+        if rng.random() >= self.think_chance[0]:
             # if so, if the AI wanna "think" about obvious moves
-            if random.random() < self.think_chance[1]:
-                match _find_win_move(board_view, current_side):
+            if rng.random() < self.think_chance[1]:
+                # the move to win, or else the move to block the opponent from winning
+                match _WIN_MOVES[current_side][position]:
                     case None:
                         pass
                     case at:
                         return at
 
-                match _find_win_move(board_view, current_side.swap_side()):
+                match _WIN_MOVES[current_side.swap_side()][position]:
                     case None:
                         pass
                     case at:
                         return at
 
             # if they don't wanna "think" about obvious moves, or there are no obvious move
-            avail_moves = [i for i, tile in enumerate(board_view) if tile is None]
-            return random.choice(avail_moves)
+            return rng.choice(_EMPTY_TILES[position])
 
         # if the AI decides to "think" deeply, let it "minimax" you
-        board = list(board_view)
-
-        move_scores = _move_scores(board, current_side, True)
-        best_move, max_score = next(move_scores)
         # there may be more than 1 best moves. Make the AI less predictable by randomizing these best moves
-        best_move = [best_move]
-        for move, score in move_scores:
-            if score > max_score:
-                max_score = score
-                best_move = [move]
-            elif score == max_score:
-                best_move.append(move)
+        return rng.choice(best_moves(board_view, current_side))
+
+
+DIFFICULTIES: dict[int, tuple[float, float]] = {
+    1: (0.0, 0.0),
+    2: (0.2, 0.2),
+    3: (0.4, 0.3),
+    4: (0.6, 0.5),
+    5: (1.0, 1.0),
+}
+"""
+The `think_chance` of each difficulty level, from 1 (braindead) to 5 (impossible)
+"""
+
+
+def decide_moves(
+        player: Player,
+        positions: Iterable[tuple[BoardView, Side]],
+        executor: Executor | None = None,
+        max_workers: int | None = None
+) -> list[int]:
+    """
+    Decide the moves for many positions at once on a thread pool.
+    The player is shared by all the worker threads, so it must be safe for concurrent use (like `MinimaxAi`).
+
+    Note that the search is pure Python: on the standard CPython build, the GIL lets only one thread run it at a
+    time, so more workers give no CPU speedup. They only pay off on a free-threaded build, or when the player
+    waits on I/O. See `bench_minimax_ai.py`
+    :param player: the player deciding the moves
+    :param positions: pairs of the board view and the side taking turn on that board
+    :param executor: the executor to run on, owned by the caller, which is left running.
+                     `None` to run on a temporary `ThreadPoolExecutor`
+    :param max_workers: the number of worker threads of the temporary `ThreadPoolExecutor`.
+                        `None` to let it choose. Ignored if `executor` is given
+    :return: the decided moves, in the same order as `positions`
+    """
+
+    def decide(position: tuple[BoardView, Side]) -> int:
+        return player.decide_move(*position)
+
+    if executor is not None:
+        return list(executor.map(decide, positions))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(decide, positions))
+
+
+def best_moves(board, current_side: Side) -> tuple[int, ...]:
+    """
+    Find the best moves by minimax. The result only depends on the position, so it's cached for the canonical
+    position: the smallest code among the 8 symmetries of the board. Symmetric boards hence share a cache entry
+    :param board: the board
+    :param current_side: the side taking turn
+    :return: all the moves with the best score, in ascending order
+    """
+
+    canonical, symmetry = min((_encode_board([board[i] for i in symmetry]), symmetry) for symmetry in _SYMMETRIES)
+    # The tile `i` of the canonical board is the tile `symmetry[i]` of the original board
+    return tuple(sorted(symmetry[move] for move in _canonical_best_moves(canonical, current_side)))
+
+
+def seed_thread_rng(seed: int | float | str | bytes | bytearray | None = None) -> None:
+    """
+    Seed the random generator `MinimaxAi` uses on the calling thread, like `random.seed` does for the global one.
+    Use it to make the games played on this thread reproducible
+    :param seed: the seed. `None` to seed from the current time or an operating system specific randomness source
+    """
+
+    _thread_rng().seed(seed)
+
+
+# Thread safety: the module-level tables (`_WIN_LINES`, `_SYMMETRIES`, `_WIN_MOVES`, `_EMPTY_TILES`, ...) are
+# built at import and never modified afterward, so any thread reads them without locking. The cache of
+# `best_moves` is an `lru_cache`, which is safe to share. The only mutable state is the random generators,
+# one per thread
+_local = threading.local()
+"""
+Per-thread state of this module. Only ever touched by the thread owning it
+"""
 
-        return random.choice(best_move)
+
+def _thread_rng() -> random.Random:
+    """
+    Gets the random generator of the calling thread, creating it on the first call.
+    Separate generators mean the threads never contend on, nor reseed, a shared random state
+    :return: the random generator owned by the calling thread
+    """
+
+    rng = getattr(_local, 'rng', None)
+    if rng is None:
+        rng = _local.rng = random.Random()
+
+    return rng
 
 
 def _max_score(board: list[Side | None], current_side: Side, is_maximizing: bool) -> int:
@@ -110,6 +211,252 @@ def _move_scores(board: list[Side | None], current_side: Side, is_maximizing: bo
         yield i, max_score
 
 
+def _move_scores_stack(board: list[Side | None], current_side: Side, is_maximizing: bool) -> list[tuple[int, int]]:
+    """
+    Same as `_move_scores`, but every move is evaluated by `_stack_score` instead of the recursive `_max_score`.
+    The scores are exactly the same as the ones `_move_scores` yields, in the same order
+
+    :param board: the game board. It is restored to its original state when this function returns
+    :param current_side: the side to consider
+    :param is_maximizing: is the current side is maximizing or not?
+    :return: the possible moves and outcomes they yield
+    """
+
+    mover = current_side if is_maximizing else current_side.swap_side()
+    scores = []
+    for i in range(len(board)):
+        if board[i] is None:
+            board[i] = mover
+            scores.append((i, _stack_score(board, current_side, is_maximizing)))
+            board[i] = None
+
+    return scores
+
+
+def _stack_score(board: list[Side | None], current_side: Side, is_maximizing: bool) -> int:
+    """
+    Same as `_max_score`, but runs on an explicit, preallocated stack of frames instead of recursion.
+    Each frame holds the next cell to try, the best score so far and the alpha-beta bounds of the node.
+    Scores are only ever -1, 0 or 1, so the bounds start at (-1, 1) and a node stops searching once its best
+    possible score is reached or the bounds cross. The score of the root is still exact.
+    A large part of the speedup over `_max_score` comes from this pruning, not only from dropping the recursion.
+    The cells are walked up to `len(board)`, while the wins are checked against `_WIN_LINES_THROUGH`
+
+    :param board: the board. It is restored to its original state on return
+    :param current_side: the current side
+    :param is_maximizing: is the current side is maximizing or not?
+    :return: the same score `_max_score` returns for the board
+    """
+
+    maximizing_side = current_side
+    minimizing_side = current_side.swap_side()
+
+    # Inside the search, a win can only come from the line through the move just made. That holds as long as
+    # nobody has won on the board yet, which is always the case in a game still going on.
+    # Leave any other board to the reference implementation
+    if has_won(board, maximizing_side) or has_won(board, minimizing_side):
+        return _max_score(board, current_side, is_maximizing)
+
+    # Base case of the root: nobody has won, so it's either a draw or the game goes on
+    empty_count = board.count(None)
+    if empty_count == 0:
+        return 0
+
+    # Frames. Frame `depth` is the node `depth` moves below the root, and `maximizing[depth]` tells whether the
+    # side taking turn at that node is maximizing
+    size = empty_count + 1
+    next_cell = [0] * size
+    made_move = [0] * size
+    best = [0] * size
+    alpha = [0] * size
+    beta = [0] * size
+    maximizing = [False] * size
+
+    depth = 0
+    maximizing[0] = not is_maximizing
+    best[0] = -2 if maximizing[0] else 2
+    alpha[0] = -1
+    beta[0] = 1
+
+    cell_count = len(board)
+    while True:
+        # find the next empty cell to try, unless the node has been cut off
+        i = next_cell[depth]
+        if alpha[depth] < beta[depth]:
+            while i < cell_count and board[i] is not None:
+                i += 1
+        else:
+            i = cell_count
+
+        if i < cell_count:
+            # Temporarily make a move on the board
+            is_max = maximizing[depth]
+            board[i] = maximizing_side if is_max else minimizing_side
+            next_cell[depth] = i + 1
+            empty_count -= 1
+
+            score = _terminal_score(board, board[i], is_max, i, empty_count)
+            if score is None:
+                # not deterministic yet. Push the frame of the opponent
+                made_move[depth] = i
+                depth += 1
+                next_cell[depth] = 0
+                maximizing[depth] = not is_max
+                best[depth] = 2 if is_max else -2
+                alpha[depth] = alpha[depth - 1]
+                beta[depth] = beta[depth - 1]
+                continue
+
+            # Undo it
+            board[i] = None
+            empty_count += 1
+        else:
+            # all the moves of this node are evaluated. Pop its frame
+            score = best[depth]
+            if depth == 0:
+                return score
+
+            depth -= 1
+            board[made_move[depth]] = None
+            empty_count += 1
+
+        # feed the score of the child into its parent
+        if maximizing[depth]:
+            if score > best[depth]:
+                best[depth] = score
+                if score > alpha[depth]:
+                    alpha[depth] = score
+        elif score < best[depth]:
+            best[depth] = score
+            if score < beta[depth]:
+                beta[depth] = score
+
+
+def _terminal_score(board: list[Side | None], moved_side: Side, is_maximizing: bool, last_move: int,
+                    empty_count: int) -> int | None:
+    """
+    The base case of `_max_score`, checking only the lines through the move just made
+    :param board: the board
+    :param moved_side: the side which has just moved
+    :param is_maximizing: is the side which has just moved maximizing or not?
+    :param last_move: the position of the move just made
+    :param empty_count: the number of empty tiles on the board
+    :return: 1 or -1 if the maximizing or minimizing side has won, 0 for a draw, or `None` if the game goes on
+    """
+
+    for a, b, c in _WIN_LINES_THROUGH[last_move]:
+        if board[a] is moved_side and board[b] is moved_side and board[c] is moved_side:
+            return 1 if is_maximizing else -1
+
+    if empty_count == 0:
+        return 0
+
+    return None
+
+
+_WIN_LINES: tuple[tuple[int, int, int], ...] = (
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),  # Rows
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),  # Columns
+    (0, 4, 8), (2, 4, 6)  # Diagonals
+)
+"""
+All the lines that win the game
+"""
+
+_WIN_LINES_THROUGH: tuple[tuple[tuple[int, int, int], ...], ...] = tuple(
+    tuple(line for line in _WIN_LINES if i in line) for i in range(9)
+)
+"""
+For each position, the winning lines passing through it
+"""
+
+
+@functools.lru_cache(maxsize=None)  # bounded anyway, by the 2 * 3^9 possible keys
+def _canonical_best_moves(canonical: int, current_side: Side) -> tuple[int, ...]:
+    """
+    The cached part of `best_moves`
+    :param canonical: the code of the canonical board
+    :param current_side: the side taking turn
+    :return: all the moves with the best score on the canonical board, in ascending order
+    """
+
+    board = _decode_board(canonical)
+    move_scores = _move_scores_stack(board, current_side, True)
+    max_score = max(score for move, score in move_scores)
+    return tuple(move for move, score in move_scores if score == max_score)
+
+
+def _compose(first: tuple[int, ...], second: tuple[int, ...]) -> tuple[int, ...]:
+    """
+    Compose two symmetries. Applying the result to a board is applying `first`, then `second`
+    :param first: the symmetry applied first
+    :param second: the symmetry applied second
+    :return: the composed symmetry
+    """
+
+    return tuple(first[i] for i in second)
+
+
+_ROTATE = (6, 3, 0, 7, 4, 1, 8, 5, 2)
+_MIRROR = (2, 1, 0, 5, 4, 3, 8, 7, 6)
+_SYMMETRIES: tuple[tuple[int, ...], ...] = tuple(
+    functools.reduce(_compose, [_ROTATE] * rotation, mirror)
+    for mirror in (tuple(range(9)), _MIRROR)
+    for rotation in range(4)
+)
+"""
+The 8 symmetries of the board. A symmetry `p` transforms a board `b` into `[b[i] for i in p]`
+"""
+
+
+def _encode_board(board) -> int:
+    """
+    Encode a board densely as a base-3 number, where each tile is a digit: 0 if empty, 1 if X, 2 if O.
+    The empty board is 0
+    :param board: the board
+    :return: the code of the board, from 0 to 3^9 - 1
+    """
+
+    code = 0
+    for tile in board:
+        code = code * 3 + (0 if tile is None else 1 if tile is Side.X else 2)
+
+    return code
+
+
+def _decode_board(code: int) -> list[Side | None]:
+    """
+    Decode a board. The inverse of `_encode_board`
+    :param code: the code of the board
+    :return: the board
+    """
+
+    board: list[Side | None] = [None] * 9
+    for i in reversed(range(9)):
+        code, digit = divmod(code, 3)
+        board[i] = (None, Side.X, Side.O)[digit]
+
+    return board
+
+
+def _build_lookup_tables() -> tuple[dict[Side, tuple[int | None, ...]], tuple[tuple[int, ...], ...]]:
+    """
+    Build `_WIN_MOVES` and `_EMPTY_TILES` by going through every possible board
+    :return: the tables
+    """
+
+    win_moves: dict[Side, list[int | None]] = {side: [None] * 3 ** 9 for side in Side}
+    empty_tiles: list[tuple[int, ...]] = [()] * 3 ** 9
+
+    # `product` counts up in base 3 with the digits of `_encode_board`, so the boards come in the order of their codes
+    for position, tiles in enumerate(itertools.product((None, Side.X, Side.O), repeat=9)):
+        for side in Side:
+            win_moves[side][position] = _find_win_move(tiles, side)
+        empty_tiles[position] = tuple(i for i, tile in enumerate(tiles) if tile is None)
+
+    return {side: tuple(moves) for side, moves in win_moves.items()}, tuple(empty_tiles)
+
+
 def _find_win_move(board, side: Side) -> int | None:
     """
     Find a spot that leads to a win of a given side
@@ -117,13 +464,7 @@ def _find_win_move(board, side: Side) -> int | None:
     :param side: the given side
     :return: that winning move, or `None` if there is not
     """
-    to_checks = [
-        [0, 1, 2], [3, 4, 5], [6, 7, 8],  # Rows
-        [0, 3, 6], [1, 4, 7], [2, 5, 8],  # Columns
-        [0, 4, 8], [2, 4, 6]  # Diagonals
-    ]
-
-    for to_check in to_checks:
+    for to_check in _WIN_LINES:
         count = 0
         empty_spot = None
         for i in to_check:
@@ -137,3 +478,10 @@ def _find_win_move(board, side: Side) -> int | None:
             return empty_spot
 
     return None
+
+
+_WIN_MOVES, _EMPTY_TILES = _build_lookup_tables()
+"""
+Indexed by `_encode_board`: for each side, the move `_find_win_move` finds for it on every board, and the empty
+tiles of every board in ascending order. Built once at import
+"""
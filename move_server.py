@@ -0,0 +1,350 @@
+# A stateless HTTP service answering "what is the AI move on this board?" for frontends that don't need
+# the interactive flow of `main.py`. Standard library only.
+#
+# GET  /move?board=X---O----&side=X&difficulty=5   -> {"board": ..., "side": ..., "difficulty": ..., "move": 0-8}
+# POST /moves  with a JSON array of {"board": ..., "side": ..., "difficulty": ...} -> a JSON array of the above
+#
+# A board is encoded as 9 characters, row by row, each either "X", "O" or "-" (empty).
+# The difficulty (1-5, default 5) is the same as the one in `main.py`.
+#
+# Caching: the moves are drawn per request, like `main.py` plays them, so the easier difficulties stay random.
+# Only the deterministic part is cached: `MinimaxAi` keeps the best moves of each position, keyed by its
+# canonical position up to symmetry, and looks up the obvious moves in precomputed tables.
+# Over HTTP, only GET at difficulty 5 is cacheable. Its move is always one of the best moves, all equally
+# good, so it gets a weak ETag over that set of moves and a `public, max-age`. The trade-off: a downstream
+# cache keeps serving the one best move it stored, instead of a fresh draw among them.
+# Everything else, including every POST /moves, is `no-store`, since shared caches don't reuse POST responses.
+import hashlib
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from game import Side, has_won
+from minimax_ai import MinimaxAi, DIFFICULTIES, best_moves
+
+_EMPTY_TILE = '-'
+
+_MAX_BATCH_SIZE = 1000
+"""
+The max number of queries in a batch request
+"""
+
+_MAX_QUERY_SIZE = 256
+"""
+The max size (in bytes) of a query in a batch request, generous for the JSON of a query
+"""
+
+_MAX_BODY_SIZE = _MAX_BATCH_SIZE * _MAX_QUERY_SIZE
+"""
+The max size (in bytes) of the body of a batch request
+"""
+
+_CACHEABLE_DIFFICULTY = 5
+"""
+The only difficulty at which the AI always plays one of the best moves, and hence the answers may be cached
+"""
+
+_MAX_AGE = 86400
+"""
+How long (in seconds) downstream caches may reuse a cacheable response
+"""
+
+_TIMEOUT = 5.0
+"""
+How long (in seconds) a connection may sit idle, or a request body may take to arrive, before it is closed
+"""
+
+_AIS: dict[int, MinimaxAi] = {difficulty: MinimaxAi(think_chance) for difficulty, think_chance in DIFFICULTIES.items()}
+"""
+The AI of each difficulty. They are shared by all the request threads
+"""
+
+
+def parse_board(encoded: str) -> list[Side | None]:
+    """
+    Decode a board
+    :param encoded: the board encoded as 9 characters, each either "X", "O" or "-" (empty)
+    :return: the board
+    :raise ValueError: if the encoding is invalid, the board can't be reached in a game,
+                       or the game on that board is already over
+    """
+
+    if len(encoded) != 9:
+        raise ValueError("A board must have exactly 9 tiles")
+
+    board: list[Side | None] = []
+    for tile in encoded.upper():
+        match tile:
+            case Side.X.value:
+                board.append(Side.X)
+            case Side.O.value:
+                board.append(Side.O)
+            case '-':
+                board.append(None)
+            case _:
+                raise ValueError(f"Invalid tile {tile!r}")
+
+    # the sides take turns, so neither can be more than 1 move ahead
+    if abs(board.count(Side.X) - board.count(Side.O)) > 1:
+        raise ValueError("Impossible board")
+
+    if has_won(board, Side.X) or has_won(board, Side.O) or None not in board:
+        raise ValueError("The game is already over")
+
+    return board
+
+
+def check_turn(board: list[Side | None], side: Side):
+    """
+    Check that a side can be the one taking turn on a board.
+    Either side may have started, but the side which is 1 move ahead can't move again
+    :param board: the board, as returned by `parse_board`
+    :param side: the side taking turn
+    :raise ValueError: if the side can't be the one taking turn
+    """
+
+    if board.count(side) > board.count(side.swap_side()):
+        raise ValueError(f"It's not the turn of {side.value}")
+
+
+def encode_board(board) -> str:
+    """
+    Encode a board. The inverse of `parse_board`
+    :param board: the board
+    :return: the board encoded as 9 characters
+    """
+
+    return ''.join(_EMPTY_TILE if tile is None else tile.value for tile in board)
+
+
+def parse_side(side: str) -> Side:
+    """
+    Decode a side
+    :param side: either "X" or "O", case-insensitive
+    :return: the side
+    :raise ValueError: if the side is invalid
+    """
+
+    match side.upper():
+        case Side.X.value:
+            return Side.X
+        case Side.O.value:
+            return Side.O
+
+    raise ValueError(f"Invalid side {side!r}")
+
+
+def parse_difficulty(difficulty: str | int) -> int:
+    """
+    Decode a difficulty
+    :param difficulty: the difficulty level, from 1 to 5, either an integer or a string of digits
+    :return: the difficulty
+    :raise ValueError: if the difficulty is invalid
+    """
+
+    # `bool` is a subclass of `int`, yet `true` is no difficulty
+    if isinstance(difficulty, bool):
+        raise ValueError(f"Invalid difficulty {difficulty!r}")
+
+    if isinstance(difficulty, int):
+        level = difficulty
+    elif isinstance(difficulty, str) and difficulty.isascii() and difficulty.isdigit():
+        level = int(difficulty)
+    else:
+        raise ValueError(f"Invalid difficulty {difficulty!r}")
+
+    if level not in DIFFICULTIES:
+        raise ValueError(f"Invalid difficulty {difficulty!r}")
+
+    return level
+
+
+def suggest_move(board: list[Side | None], side: Side, difficulty: int) -> int:
+    """
+    Suggest the AI move, drawn afresh on every call
+    :param board: the board
+    :param side: the side taking turn
+    :param difficulty: the difficulty level, from 1 to 5
+    :return: the suggested position (0-8)
+    """
+
+    # A tuple behaves like the immutable `BoardView` as far as `MinimaxAi` is concerned
+    return _AIS[difficulty].decide_move(tuple(board), side)
+
+
+def answer_query(query: dict) -> dict:
+    """
+    Answer a move query
+    :param query: a dict with "board", "side" and optionally "difficulty" (5 by default)
+    :return: the query in its normalized form, with the suggested "move"
+    :raise ValueError: if the query is invalid
+    """
+
+    if not isinstance(query, dict):
+        raise ValueError("A query must be an object")
+
+    try:
+        encoded, side = query['board'], query['side']
+    except KeyError as e:
+        raise ValueError(f"Missing {e.args[0]!r}")
+
+    if not isinstance(encoded, str) or not isinstance(side, str):
+        raise ValueError("\"board\" and \"side\" must be strings")
+
+    board = parse_board(encoded)
+    side = parse_side(side)
+    check_turn(board, side)
+    difficulty = parse_difficulty(query.get('difficulty', 5))
+
+    return {
+        'board': encode_board(board),
+        'side': side.value,
+        'difficulty': difficulty,
+        'move': suggest_move(board, side, difficulty),
+    }
+
+
+class _MoveRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handles the requests of the move service
+    """
+
+    # HTTP/1.1 keeps the connections alive. Every response must hence carry a `Content-Length`
+    protocol_version = 'HTTP/1.1'
+
+    # Put on the socket, so an idle connection or a body slower to arrive than its `Content-Length` says
+    # doesn't hold a worker thread forever
+    timeout = _TIMEOUT
+
+    def do_GET(self):
+        # A body is never read here. Close the connection, or it would be read as the next request on it
+        if 'Content-Length' in self.headers or 'Transfer-Encoding' in self.headers:
+            self.close_connection = True
+
+        url = urlsplit(self.path)
+        if url.path != '/move':
+            self._send_json(404, {'error': "Not found"})
+            return
+
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            answer = answer_query(params)
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        if answer['difficulty'] != _CACHEABLE_DIFFICULTY:
+            self._send_json(200, answer)
+            return
+
+        # Any of the best moves is as good as the others, so they all share a weak ETag
+        board, side = parse_board(answer['board']), parse_side(answer['side'])
+        validator = f"{answer['board']}:{answer['side']}:{answer['difficulty']}:{best_moves(board, side)}"
+        self._send_json(200, answer, etag=f'W/"{hashlib.sha1(validator.encode()).hexdigest()}"')
+
+    def do_POST(self):
+        # Every early return below leaves the body unread. Close the connection, or the body would be read as
+        # the next request on it
+        if urlsplit(self.path).path != '/moves':
+            self.close_connection = True
+            self._send_json(404, {'error': "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            length = None
+
+        if length is None or 'Transfer-Encoding' in self.headers:
+            self.close_connection = True
+            self._send_json(411, {'error': "Content-Length required"})
+            return
+
+        if not 0 <= length <= _MAX_BODY_SIZE:
+            self.close_connection = True
+            self._send_json(413, {'error': f"The body must be at most {_MAX_BODY_SIZE} bytes"})
+            return
+
+        try:
+            queries = json.loads(self.rfile.read(length))
+        except (ValueError, RecursionError):
+            self._send_json(400, {'error': "Invalid JSON"})
+            return
+
+        if not isinstance(queries, list):
+            self._send_json(400, {'error': "Expected an array of queries"})
+            return
+
+        if len(queries) > _MAX_BATCH_SIZE:
+            self._send_json(400, {'error': f"At most {_MAX_BATCH_SIZE} queries per batch"})
+            return
+
+        answers = []
+        for i, query in enumerate(queries):
+            try:
+                answers.append(answer_query(query))
+            except ValueError as e:
+                self._send_json(400, {'error': f"Query {i}: {e}"})
+                return
+
+        self._send_json(200, answers)
+
+    def _send_json(self, status: int, content, etag: str | None = None):
+        """
+        Send a JSON response
+        :param status: the status code
+        :param content: the content to be encoded as JSON
+        :param etag: the ETag of the response, which makes it cacheable by downstream caches.
+                     A request already having that ETag gets a "304 Not Modified" instead.
+                     `None` to forbid caching the response
+        """
+
+        if etag is None:
+            self.send_response(status)
+            self.send_header('Cache-Control', 'no-store')
+        else:
+            # "If-None-Match" compares weakly, so both "W/" and plain tags match. "*" matches any tag
+            tags = {tag.strip().removeprefix('W/') for tag in self.headers.get('If-None-Match', '').split(',')}
+            not_modified = '*' in tags or etag.removeprefix('W/') in tags
+
+            self.send_response(304 if not_modified else status)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', f'public, max-age={_MAX_AGE}')
+            if not_modified:
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+        body = json.dumps(content, separators=(',', ':')).encode()
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(host: str = '127.0.0.1', port: int = 8000) -> ThreadingHTTPServer:
+    """
+    Create the move service. Call `serve_forever` on it to start serving
+    :param host: the address to listen on
+    :param port: the port to listen on. 0 to pick any free port
+    :return: the server
+    """
+
+    return ThreadingHTTPServer((host, port), _MoveRequestHandler)
+
+
+def main():
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Serve the AI moves over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    with make_server(args.host, args.port) as server:
+        print(f"Serving on http://{args.host}:{server.server_address[1]}")
+        server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
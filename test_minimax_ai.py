@@ -1,7 +1,13 @@
-from unittest import TestCase
+import itertools
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, skipUnless
 
-from game import Game, Side, _Board, Outcome, Player
-from minimax_ai import MinimaxAi
+from game import Game, Side, _Board, Outcome, Player, BoardView, has_won
+from minimax_ai import MinimaxAi, decide_moves, best_moves, seed_thread_rng, _thread_rng, _move_scores, \
+    _move_scores_stack, _canonical_best_moves, _encode_board, _find_win_move, _WIN_MOVES, _EMPTY_TILES
 
 
 class TestMinimaxAi(TestCase):
@@ -29,6 +35,150 @@ class TestMinimaxAi(TestCase):
         self.assertIs(outcome, None)
         self.assertIs(the_game._board[0], Side.O)
 
+    def test_shared_ai_under_concurrent_load(self):
+        # every mid-game board reachable in play, so the threads run the deep search on a cold cache
+        boards = []
+        for tiles in itertools.product([None, Side.X, Side.O], repeat=9):
+            x_count, o_count = tiles.count(Side.X), tiles.count(Side.O)
+            if 4 <= tiles.count(None) <= 6 and x_count - o_count in (0, 1) \
+                    and not has_won(tiles, Side.X) and not has_won(tiles, Side.O):
+                boards.append((list(tiles), Side.X if x_count == o_count else Side.O))
+
+        _canonical_best_moves.cache_clear()
+        moves = decide_moves(MinimaxAi(), [(_board_view(board), side) for board, side in boards], max_workers=16)
+
+        self.assertGreater(len(boards), 1000)
+        for (board, side), move in zip(boards, moves, strict=True):
+            self.assertIn(move, best_moves(board, side), board)
+
+    def test_random_moves_under_concurrent_load(self):
+        board = [
+            Side.X, None, None,
+            None, Side.O, None,
+            None, None, None,
+        ]
+        # never "think", so every move is random
+        ai = MinimaxAi((0.0, 0.0))
+        random.seed(0)
+        global_state = random.getstate()
+
+        moves = decide_moves(ai, [(_board_view(board), Side.X)] * 2000, max_workers=16)
+
+        self.assertEqual(set(moves), {1, 2, 3, 5, 6, 7, 8})
+        # the AI must not touch the global random state
+        self.assertEqual(random.getstate(), global_state)
+
+    def test_decide_moves_on_caller_executor(self):
+        board = [
+            Side.O, Side.X, Side.O,
+            Side.O, Side.X, Side.X,
+            None, None, None
+        ]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for _ in range(2):
+                # the executor is left running for the next call
+                moves = decide_moves(MinimaxAi(), [(_board_view(board), Side.X)] * 20, executor=executor)
+                self.assertEqual(moves, [7] * 20)
+
+    def test_reproducible_moves(self):
+        board = [
+            Side.X, None, None,
+            None, Side.O, None,
+            None, None, None,
+        ]
+        ai = MinimaxAi((0.0, 0.0))
+
+        def play_with(rng: random.Random | None) -> list[int]:
+            return [ai.decide_move(_board_view(board), Side.X, rng) for _ in range(50)]
+
+        self.assertEqual(play_with(random.Random(42)), play_with(random.Random(42)))
+
+        seed_thread_rng(42)
+        seeded = play_with(None)
+        seed_thread_rng(42)
+        self.assertEqual(play_with(None), seeded)
+
+    def test_thread_rng_is_per_thread(self):
+        rngs = []
+
+        def collect():
+            rngs.append(_thread_rng())
+
+        threads = [threading.Thread(target=collect) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({id(rng) for rng in rngs}), 8)
+        self.assertIs(_thread_rng(), _thread_rng())
+
+    def test_stack_search_matches_recursive_search(self):
+        # a fixed sample of boards with at most 5 empty tiles, including the ones with a winner already
+        rng = random.Random(201)
+        for _ in range(300):
+            board = [rng.choice([None, Side.X, Side.O]) for _ in range(9)]
+            if not 1 <= board.count(None) <= 5:
+                continue
+
+            _assert_same_scores(self, board)
+
+    @skipUnless(os.environ.get('EXHAUSTIVE_TESTS'), "set EXHAUSTIVE_TESTS=1 to compare the searches on every board")
+    def test_stack_search_matches_recursive_search_exhaustively(self):
+        for tiles in itertools.product([None, Side.X, Side.O], repeat=9):
+            board = list(tiles)
+            if 1 <= board.count(None) <= 8:
+                _assert_same_scores(self, board)
+
+    def test_lookup_tables(self):
+        positions = set()
+        for tiles in itertools.product([None, Side.X, Side.O], repeat=9):
+            position = _encode_board(tiles)
+            positions.add(position)
+            for side in Side:
+                self.assertEqual(_WIN_MOVES[side][position], _find_win_move(tiles, side))
+            self.assertEqual(list(_EMPTY_TILES[position]), [i for i, tile in enumerate(tiles) if tile is None])
+
+        # the encoding is dense
+        self.assertEqual(positions, set(range(3 ** 9)))
+        self.assertEqual(_encode_board([None] * 9), 0)
+
+    def test_shortcut_path_distribution(self):
+        board = [
+            Side.X, None, None,
+            None, Side.O, None,
+            None, None, Side.X,
+        ]
+        ai = MinimaxAi((0.0, 0.0))
+        rng = _thread_rng()
+
+        # with the same random state, the moves are the same as choosing from the list of empty tiles
+        state = rng.getstate()
+        moves = [ai.decide_move(_board_view(board), Side.O) for _ in range(200)]
+        rng.setstate(state)
+        expected = []
+        for _ in range(200):
+            rng.random()
+            rng.random()
+            expected.append(rng.choice([1, 2, 3, 5, 6, 7]))
+
+        self.assertEqual(moves, expected)
+
+
+def _assert_same_scores(test: TestCase, board: list[Side | None]):
+    for side, is_maximizing in itertools.product(Side, [True, False]):
+        expected = list(_move_scores(list(board), side, is_maximizing))
+        copied = list(board)
+        test.assertEqual(_move_scores_stack(copied, side, is_maximizing), expected)
+        # the board must be restored
+        test.assertEqual(copied, board)
+
+
+def _board_view(tiles: list[Side | None]) -> BoardView:
+    board = _Board()
+    board.tiles = tiles
+    return BoardView(board)
+
 
 def _game_with_custom_board(p_x: Player, p_o: Player, start_side: Side, tiles: list[Side | None]) -> Game:
     the_game = Game(p_x, p_o, start_side)
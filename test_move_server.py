@@ -0,0 +1,205 @@
+import json
+import socket
+import threading
+from http.client import HTTPConnection
+from unittest import TestCase
+
+from minimax_ai import _canonical_best_moves
+from move_server import make_server, _MoveRequestHandler
+
+
+class TestMoveServer(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # shorten the timeout, so the tests on it don't take long
+        cls.timeout = _MoveRequestHandler.timeout
+        _MoveRequestHandler.timeout = 0.5
+        cls.server = make_server('127.0.0.1', 0)
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+        _MoveRequestHandler.timeout = cls.timeout
+
+    def setUp(self):
+        self.connection = HTTPConnection('127.0.0.1', self.server.server_address[1])
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_move_must_win(self):
+        status, headers, content = self._request('GET', '/move?board=OXOOXX---&side=X&difficulty=5')
+        self.assertEqual(status, 200)
+        self.assertEqual(content, {'board': 'OXOOXX---', 'side': 'X', 'difficulty': 5, 'move': 7})
+        self.assertIn('max-age', headers['Cache-Control'])
+
+    def test_move_must_block(self):
+        _, _, content = self._request('GET', '/move?board=---XO-X--&side=O')
+        self.assertEqual(content['move'], 0)
+
+    def test_symmetric_positions_share_cache(self):
+        _canonical_best_moves.cache_clear()
+        _, _, content = self._request('GET', '/move?board=---XO-X--&side=O')
+        self.assertEqual(content['move'], 0)
+        misses = _canonical_best_moves.cache_info().misses
+
+        # The same "must block" position, mirrored left to right, is answered from the same cache entry
+        hits = _canonical_best_moves.cache_info().hits
+        _, _, content = self._request('GET', '/move?board=----OX--X&side=O')
+        self.assertEqual(content['move'], 2)
+        self.assertEqual(_canonical_best_moves.cache_info().misses, misses)
+        self.assertGreater(_canonical_best_moves.cache_info().hits, hits)
+
+    def test_keep_alive_and_etag(self):
+        path = '/move?board=X---O----&side=X&difficulty=5'
+        status, headers, first = self._request('GET', path)
+        self.assertEqual(status, 200)
+        self.assertIn('max-age', headers['Cache-Control'])
+        etag = headers['ETag']
+
+        # on the same connection, the repeat queries get one of the equally best moves, under the same ETag
+        sock = self.connection.sock
+        moves = {first['move']}
+        for _ in range(30):
+            _, repeat_headers, repeat = self._request('GET', path)
+            self.assertEqual(repeat_headers['ETag'], etag)
+            moves.add(repeat['move'])
+
+        # `HTTPConnection` silently reconnects, so check that the connection has been kept alive
+        self.assertIs(self.connection.sock, sock)
+
+        self.assertLessEqual(moves, {1, 2, 3, 5, 6, 7, 8})
+        self.assertGreater(len(moves), 1)
+
+        status, _, _ = self._request('GET', path, headers={'If-None-Match': etag})
+        self.assertEqual(status, 304)
+        status, _, _ = self._request('GET', path, headers={'If-None-Match': '*'})
+        self.assertEqual(status, 304)
+        status, _, _ = self._request('GET', path, headers={'If-None-Match': '"other"'})
+        self.assertEqual(status, 200)
+
+    def test_easier_difficulties_stay_random(self):
+        moves = set()
+        for _ in range(30):
+            status, headers, content = self._request('GET', '/move?board=X---O----&side=X&difficulty=1')
+            self.assertEqual(status, 200)
+            self.assertEqual(headers['Cache-Control'], 'no-store')
+            self.assertNotIn('ETag', headers)
+            moves.add(content['move'])
+
+        self.assertGreater(len(moves), 1)
+
+    def test_batch(self):
+        queries = [
+            {'board': 'OXOOXX---', 'side': 'X'},
+            {'board': '---XO-X--', 'side': 'O', 'difficulty': 5},
+        ]
+        status, headers, content = self._request('POST', '/moves', body=json.dumps(queries))
+        self.assertEqual(status, 200)
+        self.assertEqual([answer['move'] for answer in content], [7, 0])
+        self.assertEqual(headers['Cache-Control'], 'no-store')
+        self.assertNotIn('ETag', headers)
+
+    def test_invalid_queries(self):
+        for path in [
+            '/move?board=XXX&side=O',
+            '/move?board=XXXOO----&side=O',
+            '/move?board=X---O----&side=Z',
+            '/move?board=X---O----&side=X&difficulty=6',
+            '/move?side=X',
+            '/move?board=XX-XX-O--&side=O',
+            '/move?board=OO-------&side=X',
+            '/move?board=XX--O----&side=X',
+            '/move?board=X--------&side=X',
+        ]:
+            status, headers, content = self._request('GET', path)
+            self.assertEqual(status, 400, path)
+            self.assertIn('error', content)
+            self.assertEqual(headers['Cache-Control'], 'no-store')
+
+        status, _, content = self._request('POST', '/moves', body='[{"board": "X---O----"}]')
+        self.assertEqual(status, 400)
+        self.assertIn('Query 0', content['error'])
+
+        status, _, _ = self._request('GET', '/unknown')
+        self.assertEqual(status, 404)
+
+    def test_invalid_difficulties_in_batch(self):
+        for difficulty in [True, 5.9, '5.9', ' 5', None]:
+            body = json.dumps([{'board': 'X---O----', 'side': 'X', 'difficulty': difficulty}])
+            status, _, content = self._request('POST', '/moves', body=body)
+            self.assertEqual(status, 400, difficulty)
+            self.assertIn('Invalid difficulty', content['error'])
+
+    def test_deeply_nested_body(self):
+        status, _, content = self._request('POST', '/moves', body='[' * 100000)
+        self.assertEqual(status, 400)
+        self.assertEqual(content['error'], "Invalid JSON")
+
+    def test_unread_body_does_not_leak_into_next_request(self):
+        body = b'[{"board":"OXOOXX---","side":"X"}]'
+        with self._raw_socket() as sock:
+            sock.sendall(
+                b'POST /wrong HTTP/1.1\r\nHost: localhost\r\nContent-Length: ' + str(len(body)).encode()
+                + b'\r\n\r\n' + body
+                + b'GET /move?board=OXOOXX---&side=X HTTP/1.1\r\nHost: localhost\r\n\r\n'
+            )
+            response = _read_all(sock)
+
+        # the server answers the first request, then closes the connection instead of parsing the body
+        self.assertTrue(response.startswith(b'HTTP/1.1 404'))
+        self.assertEqual(response.count(b'HTTP/1.1 '), 1)
+
+    def test_invalid_content_length(self):
+        for length in [b'-1', str(10 ** 9).encode(), b'abc']:
+            with self._raw_socket() as sock:
+                sock.sendall(b'POST /moves HTTP/1.1\r\nHost: localhost\r\nContent-Length: ' + length + b'\r\n\r\n')
+                response = _read_all(sock)
+
+            self.assertRegex(response, rb'^HTTP/1.1 (411|413)', length)
+
+    def test_short_body_times_out(self):
+        with self._raw_socket() as sock:
+            # the body never comes
+            sock.sendall(b'POST /moves HTTP/1.1\r\nHost: localhost\r\nContent-Length: 10\r\n\r\n')
+            response = _read_all(sock)
+
+        # the server gives up on the request and closes the connection
+        self.assertEqual(response, b'')
+
+    def test_idle_connection_times_out(self):
+        with self._raw_socket() as sock:
+            sock.sendall(b'GET /move?board=OXOOXX---&side=X HTTP/1.1\r\nHost: localhost\r\n\r\n')
+            # after the response, the connection sits idle until the server closes it
+            response = _read_all(sock)
+
+        self.assertTrue(response.startswith(b'HTTP/1.1 200'))
+        self.assertEqual(response.count(b'HTTP/1.1 '), 1)
+
+    def _raw_socket(self) -> socket.socket:
+        sock = socket.create_connection(('127.0.0.1', self.server.server_address[1]))
+        # a hanging server fails the test instead of blocking it
+        sock.settimeout(5)
+        return sock
+
+    def _request(self, method: str, path: str, body: str | None = None, headers: dict | None = None):
+        self.connection.request(method, path, body=body, headers=headers or {})
+        response = self.connection.getresponse()
+        content = response.read()
+        return response.status, response.headers, json.loads(content) if content else None
+
+
+def _read_all(sock: socket.socket) -> bytes:
+    """
+    Read until the server closes the connection
+    """
+
+    chunks = []
+    while chunk := sock.recv(4096):
+        chunks.append(chunk)
+    return b''.join(chunks)